@@ -13,59 +13,323 @@ from PIL import Image
 import gdown
 import io
 import base64
+import hmac
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import cv2
 
 app = Flask(__name__)
 CORS(app)
 
-# Global model variable
+MODEL_PATH = 'best.pt'
+
+# Upload format advertised to clients via /config: the model resizes to
+# INPUT_SIZE anyway, so clients downscale and re-encode before uploading
+INPUT_SIZE = 640
+UPLOAD_ENCODING = 'image/jpeg'
+UPLOAD_QUALITY = 0.9
+
+# Token required by the /admin endpoints (admin routes are disabled if unset)
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+# Poll interval in seconds for reloading MODEL_PATH when it changes on disk (0 = off)
+MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', '0'))
+
+# Global model variables
+# `model` is only ever replaced as a whole, so a request that grabbed a
+# reference keeps using that version even if a swap happens mid-request.
 model = None
+model_version = None
+model_lock = threading.Lock()
+
+# Candidate model being loaded or shadow-evaluated before promotion
+candidate = None
+reload_state = {"status": "idle", "version": None, "error": None, "replaced": None}
+reload_lock = threading.Lock()
+
+# Shadow inference runs off the request path on a single background thread.
+# At most one mirrored request is in flight; the rest are skipped so queued
+# image copies cannot pile up behind a slow candidate.
+shadow_executor = ThreadPoolExecutor(max_workers=1)
+shadow_slot = threading.Semaphore(1)
+
+# Shadow counters are bumped from request threads and the shadow thread
+shadow_stats_lock = threading.Lock()
+
+def _version_for(path):
+    """Build a version label from the weights file name and mtime"""
+    return f"{os.path.basename(path)}@{int(os.path.getmtime(path))}"
+
+def warm_up(yolo_model):
+    """Run a dummy prediction so the first real request skips lazy init"""
+    blank = np.zeros((640, 640, 3), dtype=np.uint8)
+    yolo_model.predict(blank, conf=0.25, verbose=False)
 
 def load_model():
     """Load the YOLO model (cached)"""
-    global model
+    global model, model_version
     if model is None:
-        model_path = 'best.pt'
-        
-        # Download if not exists
-        if not os.path.exists(model_path):
-            file_id = "1SjfGJ3UUgWQ_V95TLWoWsmkNk-VaAXkv"
-            url = f'https://drive.google.com/uc?id={file_id}'
-            gdown.download(url, model_path, quiet=False)
-        
-        model = YOLO(model_path)
+        with model_lock:
+            if model is None:
+                # Download if not exists
+                if not os.path.exists(MODEL_PATH):
+                    file_id = "1SjfGJ3UUgWQ_V95TLWoWsmkNk-VaAXkv"
+                    url = f'https://drive.google.com/uc?id={file_id}'
+                    gdown.download(url, MODEL_PATH, quiet=False)
+                
+                model_version = _version_for(MODEL_PATH)
+                model = YOLO(MODEL_PATH)
     
     return model
 
-@app.route('/health', methods=['GET'])
-def health():
-    """Health check endpoint"""
-    return jsonify({"status": "healthy"})
+def current_model():
+    """Return the serving model and its version as a consistent pair"""
+    load_model()
+    with model_lock:
+        return model, model_version
 
-@app.route('/detect', methods=['POST'])
-def detect():
-    """Detect birds in uploaded image"""
+def _load_candidate(path, shadow_sample):
+    """Load and warm a new model, then promote it or stage it for shadowing"""
+    global candidate
+    version = None
     try:
-        if 'image' not in request.files:
-            return jsonify({"error": "No image file provided"}), 400
-        
-        file = request.files['image']
-        if file.filename == '':
-            return jsonify({"error": "No image file selected"}), 400
-        
-        # Load model
-        model = load_model()
-        
-        # Read image
-        image = Image.open(file.stream)
-        
-        # Convert PIL to numpy array
-        image_np = np.array(image)
-        
-        # Run detection
-        results = model.predict(image_np, conf=0.25, verbose=False)
+        version = _version_for(path)
+        new_model = YOLO(path)
+        warm_up(new_model)
+    except Exception as e:
+        reload_state.update(status="failed", version=version, error=str(e))
+        return
+    
+    if shadow_sample > 0:
+        with model_lock:
+            replaced = candidate
+            candidate = {
+                "model": new_model,
+                "version": version,
+                "sample_rate": shadow_sample,
+                "stats": {
+                    "requests": 0,
+                    "agreements": 0,
+                    "errors": 0,
+                    "skipped": 0,
+                    "primary_ms_total": 0.0,
+                    "candidate_ms_total": 0.0,
+                },
+            }
+        reload_state.update(
+            status="shadowing", version=version, error=None,
+            replaced=replaced["version"] if replaced else None
+        )
+    else:
+        _promote(new_model, version)
+
+def _promote(new_model, version):
+    """Atomically swap in a warmed model"""
+    global model, model_version, candidate
+    # Wait out any mirrored prediction so the promoted model is never used
+    # by the shadow thread and a request thread at the same time
+    shadow_slot.acquire()
+    try:
+        with model_lock:
+            replaced = candidate
+            model = new_model
+            model_version = version
+            candidate = None
+    finally:
+        shadow_slot.release()
+    
+    dropped = None
+    if replaced is not None and replaced["model"] is not new_model:
+        dropped = replaced["version"]
+    reload_state.update(status="promoted", version=version, error=None, replaced=dropped)
+
+def start_reload(path=MODEL_PATH, shadow_sample=0.0, replace_candidate=True):
+    """Load a model version in the background
+
+    Returns False if one is already loading, or if a candidate is being
+    shadow-evaluated and `replace_candidate` is False.
+    """
+    with reload_lock:
+        if reload_state["status"] == "loading":
+            return False
+        if reload_state["status"] == "shadowing" and not replace_candidate:
+            return False
+        reload_state.update(status="loading", version=None, error=None, replaced=None)
+    thread = threading.Thread(
+        target=_load_candidate, args=(path, shadow_sample), daemon=True
+    )
+    thread.start()
+    return True
+
+def _species_set(results, names):
+    """Species labels detected in a prediction, for agreement checks"""
+    return {names[int(box.cls[0])] for box in results[0].boxes}
+
+def _record_shadow(shadow, **increments):
+    """Add to a candidate's shadow counters"""
+    with shadow_stats_lock:
+        for key, value in increments.items():
+            shadow["stats"][key] += value
+
+def _shadow_predict(shadow, image_np, primary_species, primary_ms):
+    """Run the candidate on a mirrored request and record latency/agreement"""
+    try:
+        # Promoted or discarded since this request was mirrored
+        if candidate is not shadow:
+            return
+        start_time = time.perf_counter()
+        results = shadow["model"].predict(image_np, conf=0.25, verbose=False)
+        candidate_ms = (time.perf_counter() - start_time) * 1000
+    except Exception:
+        _record_shadow(shadow, errors=1)
+        return
+    finally:
+        shadow_slot.release()
+    
+    agreed = _species_set(results, shadow["model"].names) == primary_species
+    _record_shadow(
+        shadow,
+        requests=1,
+        primary_ms_total=primary_ms,
+        candidate_ms_total=candidate_ms,
+        agreements=int(agreed)
+    )
+
+def _shadow_summary(shadow):
+    """Averaged shadow stats for the admin status endpoint"""
+    with shadow_stats_lock:
+        stats = dict(shadow["stats"])
+    n = stats["requests"]
+    return {
+        "version": shadow["version"],
+        "sample_rate": shadow["sample_rate"],
+        "requests": n,
+        "errors": stats["errors"],
+        "skipped": stats["skipped"],
+        "agreement_rate": round(stats["agreements"] / n, 3) if n else None,
+        "primary_avg_ms": round(stats["primary_ms_total"] / n, 1) if n else None,
+        "candidate_avg_ms": round(stats["candidate_ms_total"] / n, 1) if n else None,
+    }
+
+def _watch_model_file():
+    """Reload MODEL_PATH in the background whenever its mtime changes
+
+    A change is only acted on once the mtime has been stable for a full
+    interval, so a file that is still being written is not loaded.
+    """
+    loaded_mtime = None
+    previous_mtime = None
+    while True:
+        try:
+            mtime = os.path.getmtime(MODEL_PATH)
+        except OSError:
+            mtime = None
         
+        if mtime is not None:
+            if loaded_mtime is None or model is None:
+                # Nothing to hot-swap yet; load_model() will read the current file
+                loaded_mtime = mtime
+            elif mtime != loaded_mtime and mtime == previous_mtime:
+                # Only mark this version as seen once a reload actually starts;
+                # while a candidate is being shadowed the reload is deferred
+                if start_reload(MODEL_PATH, replace_candidate=False):
+                    loaded_mtime = mtime
+        previous_mtime = mtime
+        time.sleep(MODEL_WATCH_INTERVAL)
+
+if MODEL_WATCH_INTERVAL > 0:
+    threading.Thread(target=_watch_model_file, daemon=True).start()
+
+def _require_admin():
+    """Return an error response unless the request carries ADMIN_TOKEN"""
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Admin endpoints are disabled"}), 404
+    token = request.headers.get('X-Admin-Token', '')
+    if not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        return jsonify({"error": "Unauthorized"}), 401
+    return None
+
+def upload_config():
+    """Input size and encoding clients should use for uploads"""
+    return {
+        "input_size": INPUT_SIZE,
+        "encoding": UPLOAD_ENCODING,
+        "quality": UPLOAD_QUALITY
+    }
+
+def original_size(headers, image):
+    """Size of the image before client-side downscaling, from X-Original-* headers"""
+    try:
+        width = int(headers.get('X-Original-Width', image.width))
+        height = int(headers.get('X-Original-Height', image.height))
+    except (TypeError, ValueError):
+        return image.size
+    if width <= 0 or height <= 0:
+        return image.size
+    return width, height
+
+def detect_image(image, size=None, annotate=True):
+    """Run detection on a PIL image and build the /detect response payload
+
+    Args:
+        image: Image as received (possibly downscaled by the client)
+        size: (width, height) of the original image; boxes are mapped back to it
+        annotate: Include the annotated result image in the payload
+    """
+    width, height = size or image.size
+    scale_x = width / image.width
+    scale_y = height / image.height
+    
+    # Pin the model version for the whole request
+    model, version = current_model()
+    shadow = candidate
+    
+    # Convert PIL to numpy array
+    image_np = np.array(image)
+    
+    # Run detection
+    start_time = time.perf_counter()
+    results = model.predict(image_np, conf=0.25, verbose=False)
+    primary_ms = (time.perf_counter() - start_time) * 1000
+    
+    # Mirror a sample of traffic to the candidate model
+    if shadow is not None and random.random() < shadow["sample_rate"]:
+        if shadow_slot.acquire(blocking=False):
+            shadow_executor.submit(
+                _shadow_predict, shadow, image_np,
+                _species_set(results, model.names), primary_ms
+            )
+        else:
+            _record_shadow(shadow, skipped=1)
+    
+    # Extract detections, with boxes in original-image pixels
+    detections = []
+    for box in results[0].boxes:
+        cls = int(box.cls[0])
+        conf = float(box.conf[0])
+        label = model.names[cls]
+        x1, y1, x2, y2 = box.xyxy[0].tolist()
+        detections.append({
+            "species": label,
+            "confidence": round(conf * 100, 1),
+            "bbox": [
+                round(x1 * scale_x, 1), round(y1 * scale_y, 1),
+                round(x2 * scale_x, 1), round(y2 * scale_y, 1)
+            ]
+        })
+    
+    payload = {
+        "success": True,
+        "detections": detections,
+        "count": len(detections),
+        "image_size": {"width": width, "height": height},
+        "model_version": version
+    }
+    
+    if annotate:
         # Get result image with bounding boxes
         result_img = results[0].plot()
         
@@ -77,28 +341,125 @@ def detect():
         buffer = io.BytesIO()
         result_pil.save(buffer, format='PNG')
         result_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+        payload["result_image"] = f"data:image/png;base64,{result_base64}"
+    
+    return payload
+
+@app.route('/health', methods=['GET'])
+def health():
+    """Health check endpoint"""
+    return jsonify({"status": "healthy"})
+
+@app.route('/config', methods=['GET'])
+def config():
+    """Upload parameters for client-side downscaling"""
+    return jsonify(upload_config())
+
+@app.route('/detect', methods=['POST'])
+def detect():
+    """Detect birds in uploaded image
+
+    Accepts either a multipart form with an `image` file, or the raw image
+    bytes as the body with an image/* Content-Type (see /config).
+    """
+    try:
+        if request.mimetype.startswith('image/'):
+            # Binary upload, usually already downscaled by the client
+            if not request.data:
+                return jsonify({"error": "Empty image body"}), 400
+            image = Image.open(io.BytesIO(request.data))
+        else:
+            if 'image' not in request.files:
+                return jsonify({"error": "No image file provided"}), 400
+            
+            file = request.files['image']
+            if file.filename == '':
+                return jsonify({"error": "No image file selected"}), 400
+            
+            # Read image
+            image = Image.open(file.stream)
         
-        # Extract detections
-        detections = []
-        for box in results[0].boxes:
-            cls = int(box.cls[0])
-            conf = float(box.conf[0])
-            label = model.names[cls]
-            detections.append({
-                "species": label,
-                "confidence": round(conf * 100, 1)
-            })
-        
-        return jsonify({
-            "success": True,
-            "detections": detections,
-            "result_image": f"data:image/png;base64,{result_base64}",
-            "count": len(detections)
-        })
+        annotate = request.args.get('annotate', '1') != '0'
+        return jsonify(detect_image(image, original_size(request.headers, image), annotate))
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/admin/model', methods=['GET'])
+def admin_model_status():
+    """Report the serving model, any reload in progress and shadow stats"""
+    denied = _require_admin()
+    if denied:
+        return denied
+    
+    shadow = candidate
+    return jsonify({
+        "serving_version": model_version,
+        "reload": reload_state,
+        "shadow": _shadow_summary(shadow) if shadow else None
+    })
+
+@app.route('/admin/reload', methods=['POST'])
+def admin_reload():
+    """Load and warm a new model version in the background
+
+    JSON body (all optional):
+        path: weights file to load (defaults to best.pt)
+        shadow_sample: fraction of traffic to mirror to the new model
+            before promotion; 0 promotes as soon as it is warm
+    """
+    denied = _require_admin()
+    if denied:
+        return denied
+    
+    body = request.get_json(silent=True) or {}
+    path = body.get('path', MODEL_PATH)
+    if not os.path.exists(path):
+        return jsonify({"error": f"Model file not found: {path}"}), 400
+    try:
+        shadow_sample = float(body.get('shadow_sample', 0))
+    except (TypeError, ValueError):
+        return jsonify({"error": "shadow_sample must be a number"}), 400
+    if not 0 <= shadow_sample <= 1:
+        return jsonify({"error": "shadow_sample must be between 0 and 1"}), 400
+    
+    if not start_reload(path, shadow_sample):
+        return jsonify({"error": "A model is already loading"}), 409
+    return jsonify({"status": "loading", "path": path}), 202
+
+@app.route('/admin/promote', methods=['POST'])
+def admin_promote():
+    """Promote the shadowed candidate model to serving"""
+    denied = _require_admin()
+    if denied:
+        return denied
+    
+    with reload_lock:
+        shadow = candidate
+        if shadow is None:
+            return jsonify({"error": "No candidate model to promote"}), 409
+        _promote(shadow["model"], shadow["version"])
+    return jsonify({"status": "promoted", "shadow": _shadow_summary(shadow)})
+
+@app.route('/admin/discard', methods=['POST'])
+def admin_discard():
+    """Drop the shadowed candidate model without promoting it"""
+    global candidate
+    denied = _require_admin()
+    if denied:
+        return denied
+    
+    with reload_lock:
+        if reload_state["status"] == "loading":
+            return jsonify({"error": "A model is still loading"}), 409
+        with model_lock:
+            shadow = candidate
+            candidate = None
+        if shadow is None:
+            return jsonify({"error": "No candidate model to discard"}), 409
+        reload_state.update(status="idle", version=None, error=None, replaced=None)
+    return jsonify({"status": "discarded", "shadow": _shadow_summary(shadow)})
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     app.run(debug=False, host='0.0.0.0', port=port)
@@ -44,6 +44,7 @@ except ImportError as e:
 
 from PIL import Image
 import gdown
+from batch import BatchJob
 import io
 import time
 from datetime import datetime
@@ -88,10 +89,15 @@ st.markdown("""
 st.title("🐦 Bird Species Detector")
 st.write("Upload an image to detect and classify bird species using YOLOv8")
 
+MODEL_PATH = 'best.pt'
+
+# Thumbnails shown while a batch is still running
+BATCH_PREVIEW_COUNT = 8
+
 # Load model (cached so it only loads once)
 @st.cache_resource
 def load_model():
-    model_path = 'best.pt'
+    model_path = MODEL_PATH
     
     # Download if not exists
     if not os.path.exists(model_path):
@@ -108,6 +114,13 @@ def load_model():
     
     return YOLO(model_path)
 
+# Separate model instance for background batch jobs, since YOLO predictors
+# are not safe to share with the one serving single-image requests
+@st.cache_resource
+def load_batch_model():
+    load_model()
+    return YOLO(MODEL_PATH)
+
 def get_bird_info_url(bird_name):
     """Generate Wikipedia URL for bird species"""
     # Clean bird name for URL
@@ -120,12 +133,175 @@ def get_allaboutbirds_url(bird_name):
     search_name = bird_name.replace(" ", "+")
     return f"https://www.allaboutbirds.org/guide/{search_name}"
 
+def render_batch_card(job, index, entry, interactive, opened_key):
+    """One gallery tile; the annotated image is drawn only when opened"""
+    if entry["status"] == "pending":
+        st.caption(f"⏳ {entry['name']}")
+        return
+    if entry["status"] == "cancelled":
+        st.caption(f"⏹️ {entry['name']} (cancelled)")
+        return
+    if entry["status"] == "error":
+        st.caption(f"❌ {entry['name']}")
+        st.error(entry["error"])
+        return
+    
+    st.image(entry["thumbnail"], use_container_width=True)
+    if entry["detections"]:
+        top = max(entry["detections"], key=lambda d: d["confidence"])
+        st.caption(
+            f"**{entry['name']}** — {top['species']} ({top['confidence']*100:.1f}%)"
+            + (f" +{len(entry['detections']) - 1} more" if len(entry["detections"]) > 1 else "")
+        )
+    else:
+        st.caption(f"**{entry['name']}** — no birds detected")
+    
+    if not interactive:
+        return
+    if st.button("🎯 Show annotated", key=f"btn_{opened_key}_{index}", use_container_width=True):
+        st.session_state[opened_key] = index
+    if st.session_state.get(opened_key) == index:
+        png = job.annotated_png(index)
+        st.image(png, use_container_width=True)
+        st.download_button(
+            label="📥 Download",
+            data=png,
+            file_name=f"{entry['name'].rsplit('.', 1)[0]}_detected.png",
+            mime="image/png",
+            key=f"dl_{opened_key}_{index}",
+            use_container_width=True
+        )
+
+def render_batch_gallery(job, entries, columns=4, interactive=True):
+    """Grid of (index, entry) tiles
+
+    Annotations are re-drawn on every rerun, so at most one is open at a time
+    and none are offered while the progress view is polling.
+    """
+    opened_key = f"batch_open_{id(job)}"
+    cols = st.columns(columns)
+    for position, (index, entry) in enumerate(entries):
+        with cols[position % columns]:
+            render_batch_card(job, index, entry, interactive, opened_key)
+
+def render_batch_summary(job):
+    """Species summary table across all finished images"""
+    summary = job.species_summary()
+    if summary:
+        st.dataframe(summary, use_container_width=True, hide_index=True)
+    else:
+        st.caption("No birds detected yet.")
+
+@st.fragment(run_every=1.0)
+def batch_progress_view(job):
+    """Re-renders every second while the background job runs"""
+    if job.done:
+        # Switch to the static results view
+        st.rerun()
+    
+    finished, total = job.progress()
+    st.progress(finished / total if total else 1.0, text=f"Processed {finished} of {total} image(s)...")
+    if st.button("⏹️ Cancel batch"):
+        job.cancel()
+    
+    st.subheader("📊 Species Summary")
+    render_batch_summary(job)
+    # Only the latest few thumbnails: re-sending the whole grid every
+    # second would cost O(N) images per refresh on large folders
+    finished_entries = [
+        (i, e) for i, e in enumerate(job.snapshot()) if e["status"] in ("done", "error")
+    ]
+    st.subheader("🖼️ Latest Results")
+    if finished_entries:
+        render_batch_gallery(job, finished_entries[-BATCH_PREVIEW_COUNT:], interactive=False)
+    else:
+        st.caption("Waiting for the first images...")
+
+def render_batch_mode(confidence):
+    """Multi-file upload processed by a background worker"""
+    uploaded_files = st.file_uploader(
+        "Choose bird images...", type=['jpg', 'jpeg', 'png'], accept_multiple_files=True
+    )
+    
+    job = st.session_state.get('batch_job')
+    if uploaded_files and st.button(f"🚀 Process {len(uploaded_files)} image(s)", use_container_width=True):
+        if job is not None:
+            job.cancel()
+        files = [(f.name, f.getvalue()) for f in uploaded_files]
+        job = BatchJob(load_batch_model(), files, conf=confidence).start()
+        st.session_state.batch_job = job
+        st.session_state.batch_zip = None
+    
+    if job is None:
+        st.info("👆 Upload one or more images above, then start the batch.")
+        return
+    
+    if not job.done:
+        batch_progress_view(job)
+        return
+    
+    finished, total = job.progress()
+    if job.error:
+        st.error(f"Batch failed: {job.error}")
+    elif job.cancelled:
+        st.warning(f"⏹️ Batch cancelled after {finished} of {total} image(s); the rest were skipped")
+    else:
+        st.success(f"✅ Processed {finished} of {total} image(s) at confidence ≥ {job.conf*100:.0f}%")
+    
+    st.subheader("📊 Species Summary")
+    render_batch_summary(job)
+    
+    st.subheader("💾 Export Results")
+    timestamp = int(time.time())
+    col_export1, col_export2, col_export3 = st.columns(3)
+    with col_export1:
+        st.download_button(
+            label="📋 Download All (JSON)",
+            data=job.to_json().encode('utf-8'),
+            file_name=f"bird_batch_{timestamp}.json",
+            mime="application/json",
+            use_container_width=True
+        )
+    with col_export2:
+        st.download_button(
+            label="📄 Download All (CSV)",
+            data=job.to_csv().encode('utf-8'),
+            file_name=f"bird_batch_{timestamp}.csv",
+            mime="text/csv",
+            use_container_width=True
+        )
+    with col_export3:
+        # Building the zip draws every annotated image, so only do it on request
+        if st.session_state.get('batch_zip') is None:
+            if st.button("🗜️ Prepare ZIP with Annotated Images", use_container_width=True):
+                with st.spinner("Drawing annotated images..."):
+                    st.session_state.batch_zip = job.to_zip()
+                st.rerun()
+        else:
+            st.download_button(
+                label="📦 Download All (ZIP)",
+                data=st.session_state.batch_zip,
+                file_name=f"bird_batch_{timestamp}.zip",
+                mime="application/zip",
+                use_container_width=True
+            )
+    
+    st.subheader("🖼️ Results")
+    render_batch_gallery(job, list(enumerate(job.snapshot())))
+
 model = load_model()
 
 # Sidebar with settings
 with st.sidebar:
     st.header("⚙️ Settings")
     
+    mode = st.radio(
+        "Mode",
+        ["Single image", "Batch"],
+        horizontal=True,
+        help="Batch mode processes many images in the background and fills in results as they finish."
+    )
+    
     # Confidence threshold slider
     confidence = st.slider(
         "Confidence Threshold",
@@ -170,13 +346,17 @@ with st.sidebar:
     
     st.header("📖 How to Use")
     st.write("""
-    1. Upload a bird image (JPG, JPEG, or PNG)
+    1. Upload a bird image (JPG, JPEG, or PNG), or switch to Batch mode for many
     2. Adjust confidence threshold if needed
     3. Wait for detection (~1 second)
     4. View results with bounding boxes and species labels
     5. Download the annotated image
     """)
 
+if mode == "Batch":
+    render_batch_mode(confidence)
+    st.stop()
+
 # File uploader
 uploaded_file = st.file_uploader("Choose a bird image...", type=['jpg', 'jpeg', 'png'])
 
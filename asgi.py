@@ -0,0 +1,190 @@
+"""
+Async ASGI API for Bird Detection
+Same /detect, /health and /config contract as api.py, with admission control.
+
+Run with: uvicorn asgi:app --host 0.0.0.0 --port 5000
+"""
+import asyncio
+import io
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from PIL import Image
+
+# Reuse the Flask API's model loading, hot-reload and response building
+import api
+
+# Maximum requests admitted (running + waiting) before new ones get a 503
+MAX_QUEUE = int(os.environ.get('MAX_QUEUE', '8'))
+
+# Per-request time budget in milliseconds, overridable via DEADLINE_HEADER
+DEFAULT_DEADLINE_MS = float(os.environ.get('DEFAULT_DEADLINE_MS', '30000'))
+DEADLINE_HEADER = 'X-Request-Deadline-Ms'
+
+# Weight of the newest sample in the moving average of inference latency
+LATENCY_SMOOTHING = 0.2
+
+# One inference thread per process: every request shares api.model and YOLO
+# predictors are not thread-safe. Scale out with `uvicorn --workers N`.
+executor = ThreadPoolExecutor(max_workers=1)
+inference_slot = asyncio.Lock()
+
+model_ready = False
+model_error = None
+pending = 0
+
+# Start from the documented ~300ms per image until real timings arrive
+latency_ewma_ms = 300.0
+
+def load_and_warm():
+    """Load the model and run a warm-up prediction (runs in the executor)"""
+    global model_ready, model_error
+    try:
+        api.warm_up(api.load_model())
+        model_ready = True
+    except Exception as e:
+        model_error = str(e)
+
+def estimated_completion_ms():
+    """Rough time for a newly admitted request to finish, given the queue ahead of it"""
+    return (pending + 1) * latency_ewma_ms
+
+def detect_bytes(image_bytes, headers, annotate):
+    """Decode uploaded bytes and run detection (runs in the executor)"""
+    image = Image.open(io.BytesIO(image_bytes))
+    return api.detect_image(image, api.original_size(headers, image), annotate)
+
+def shed(message, wait_ms=None):
+    """503 response telling the client to back off"""
+    headers = {}
+    if wait_ms is not None:
+        headers['Retry-After'] = str(max(1, math.ceil(wait_ms / 1000)))
+    return JSONResponse({"error": message}, status_code=503, headers=headers)
+
+async def health(request):
+    """Readiness check based on model state and queue depth"""
+    if model_error:
+        status, code = "error", 503
+    elif not model_ready:
+        status, code = "loading", 503
+    elif pending >= MAX_QUEUE:
+        status, code = "overloaded", 503
+    else:
+        status, code = "healthy", 200
+
+    return JSONResponse({
+        "status": status,
+        "model_loaded": model_ready,
+        "model_version": api.model_version,
+        "queue_depth": pending,
+        "max_queue": MAX_QUEUE,
+        "estimated_wait_ms": round(estimated_completion_ms()),
+        "error": model_error
+    }, status_code=code)
+
+async def config(request):
+    """Upload parameters for client-side downscaling"""
+    return JSONResponse(api.upload_config())
+
+async def detect(request):
+    """Detect birds in uploaded image (multipart form or raw image/* body)"""
+    global pending, latency_ewma_ms
+    start_time = time.monotonic()
+
+    try:
+        deadline_ms = float(request.headers.get(DEADLINE_HEADER, DEFAULT_DEADLINE_MS))
+        if not math.isfinite(deadline_ms) or deadline_ms <= 0:
+            raise ValueError(deadline_ms)
+    except ValueError:
+        return JSONResponse({"error": f"Invalid {DEADLINE_HEADER} header"}, status_code=400)
+
+    # A failed load won't recover by retrying, so don't send Retry-After
+    if model_error:
+        return JSONResponse({"error": f"Model failed to load: {model_error}"}, status_code=500)
+
+    # Admission control: reject early instead of letting requests time out
+    if not model_ready:
+        return shed("Model is still loading", latency_ewma_ms)
+    if pending >= MAX_QUEUE:
+        return shed("Server is at capacity", estimated_completion_ms())
+    estimate_ms = estimated_completion_ms()
+    if estimate_ms > deadline_ms:
+        return shed(
+            f"Estimated wait {estimate_ms:.0f}ms exceeds deadline {deadline_ms:.0f}ms",
+            estimate_ms
+        )
+
+    pending += 1
+    try:
+        if request.headers.get('content-type', '').startswith('image/'):
+            image_bytes = await request.body()
+            if not image_bytes:
+                return JSONResponse({"error": "Empty image body"}, status_code=400)
+        else:
+            form = await request.form()
+            file = form.get('image')
+            if file is None or isinstance(file, str):
+                return JSONResponse({"error": "No image file provided"}, status_code=400)
+            if not file.filename:
+                return JSONResponse({"error": "No image file selected"}, status_code=400)
+            image_bytes = await file.read()
+        annotate = request.query_params.get('annotate', '1') != '0'
+
+        # Wait for an inference slot, but only as long as the deadline allows
+        remaining = deadline_ms / 1000 - (time.monotonic() - start_time)
+        if remaining <= 0:
+            return shed("Deadline exceeded before inference started")
+        try:
+            await asyncio.wait_for(inference_slot.acquire(), timeout=remaining)
+        except asyncio.TimeoutError:
+            return shed("Deadline exceeded before inference started")
+
+        try:
+            inference_start = time.monotonic()
+            loop = asyncio.get_running_loop()
+            payload = await loop.run_in_executor(
+                executor, detect_bytes, image_bytes, request.headers, annotate
+            )
+            elapsed_ms = (time.monotonic() - inference_start) * 1000
+            latency_ewma_ms += LATENCY_SMOOTHING * (elapsed_ms - latency_ewma_ms)
+        finally:
+            inference_slot.release()
+
+        return JSONResponse(payload)
+
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+    finally:
+        pending -= 1
+
+@asynccontextmanager
+async def lifespan(app):
+    # Load the model in the background so /health can report "loading"
+    loop = asyncio.get_running_loop()
+    loop.run_in_executor(executor, load_and_warm)
+    yield
+    executor.shutdown(wait=False)
+
+app = Starlette(
+    routes=[
+        Route('/health', health, methods=['GET']),
+        Route('/config', config, methods=['GET']),
+        Route('/detect', detect, methods=['POST']),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan
+)
+
+if __name__ == '__main__':
+    import uvicorn
+    port = int(os.environ.get('PORT', 5000))
+    uvicorn.run(app, host='0.0.0.0', port=port)
@@ -0,0 +1,239 @@
+"""
+Background batch processing for the Streamlit app
+Runs batched YOLO inference over many uploaded images on a worker thread
+so the UI can show results as they finish.
+"""
+import csv
+import io
+import json
+import threading
+import time
+import zipfile
+from datetime import datetime
+
+import numpy as np
+from PIL import Image
+from ultralytics.utils.plotting import Annotator, colors
+
+# Images passed to a single model.predict call
+BATCH_SIZE = 8
+
+# Longest side of the gallery thumbnails kept for each image
+THUMBNAIL_SIZE = 320
+
+# YOLO predictors are not safe to share across threads, and every job uses
+# the same dedicated batch model, so only one batch predicts at a time
+_predict_lock = threading.Lock()
+
+class BatchJob:
+    """Batched detection over a list of uploaded images
+
+    Only the compressed upload bytes, a thumbnail and the detections are
+    kept per image; annotated images are re-drawn from those on request.
+
+    Args:
+        model: YOLO model reserved for batch jobs (not the one serving
+            single-image requests)
+        files: List of (file name, image bytes) tuples
+        conf: Confidence threshold
+        batch_size: Images per predict call
+    """
+
+    def __init__(self, model, files, conf=0.25, batch_size=BATCH_SIZE):
+        self.model = model
+        self.conf = conf
+        self.batch_size = batch_size
+        self.error = None
+        self.created_at = datetime.now()
+        self.finished = threading.Event()
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._files = [data for _, data in files]
+        self.entries = [
+            {"name": name, "status": "pending", "detections": [], "error": None}
+            for name, _ in files
+        ]
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def done(self):
+        return self.finished.is_set()
+
+    @property
+    def cancelled(self):
+        """True if the job was cancelled before every image was processed"""
+        with self._lock:
+            return any(e["status"] == "cancelled" for e in self.entries)
+
+    def progress(self):
+        """Return (images processed, total images)"""
+        with self._lock:
+            finished = sum(1 for e in self.entries if e["status"] in ("done", "error"))
+        return finished, len(self.entries)
+
+    def snapshot(self):
+        """Copy of the per-image entries, safe to read while the worker runs"""
+        with self._lock:
+            return [dict(e) for e in self.entries]
+
+    def _run(self):
+        try:
+            indices = list(range(len(self._files)))
+            for start in range(0, len(indices), self.batch_size):
+                if self._cancelled.is_set():
+                    break
+                self._run_batch(indices[start:start + self.batch_size])
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            if self._cancelled.is_set():
+                with self._lock:
+                    for entry in self.entries:
+                        if entry["status"] == "pending":
+                            entry["status"] = "cancelled"
+            self.finished.set()
+
+    def _run_batch(self, chunk):
+        indices, images = [], []
+        for index in chunk:
+            data = self._files[index]
+            try:
+                image = Image.open(io.BytesIO(data)).convert("RGB")
+            except Exception as e:
+                self._update(index, status="error", error=f"Could not read image: {e}")
+                continue
+            indices.append(index)
+            images.append(image)
+
+        if not images:
+            return
+
+        try:
+            with _predict_lock:
+                start_time = time.time()
+                results = self.model.predict(images, conf=self.conf, verbose=False)
+            per_image_ms = (time.time() - start_time) * 1000 / len(images)
+        except Exception as e:
+            for index in indices:
+                self._update(index, status="error", error=str(e))
+            return
+
+        for index, image, result in zip(indices, images, results):
+            detections = []
+            for box in result.boxes:
+                cls = int(box.cls[0])
+                detections.append({
+                    "class_id": cls,
+                    "species": self.model.names[cls],
+                    "confidence": float(box.conf[0]),
+                    "bbox": box.xyxy[0].cpu().numpy().tolist()
+                })
+
+            thumbnail = image.copy()
+            thumbnail.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+
+            self._update(
+                index,
+                status="done",
+                detections=detections,
+                width=image.width,
+                height=image.height,
+                thumbnail=thumbnail,
+                inference_time_ms=round(per_image_ms, 2)
+            )
+
+    def _update(self, index, **fields):
+        with self._lock:
+            self.entries[index].update(fields)
+
+    def annotated_png(self, index):
+        """PNG bytes of image `index` with boxes drawn, re-rendered on each call"""
+        with self._lock:
+            entry = dict(self.entries[index])
+        if entry["status"] != "done":
+            return None
+
+        image = Image.open(io.BytesIO(self._files[index])).convert("RGB")
+        # Annotator draws in BGR like Results.plot()
+        annotator = Annotator(np.ascontiguousarray(np.asarray(image)[..., ::-1]))
+        for d in entry["detections"]:
+            annotator.box_label(
+                d["bbox"], f"{d['species']} {d['confidence']:.2f}", color=colors(d["class_id"], True)
+            )
+        annotated = Image.fromarray(annotator.result()[..., ::-1])
+
+        buffer = io.BytesIO()
+        annotated.save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    def species_summary(self):
+        """Per-species detection counts across all finished images"""
+        summary = {}
+        for entry in self.snapshot():
+            for d in entry["detections"]:
+                row = summary.setdefault(d["species"], {
+                    "species": d["species"], "detections": 0, "images": set(), "total_conf": 0.0
+                })
+                row["detections"] += 1
+                row["images"].add(entry["name"])
+                row["total_conf"] += d["confidence"]
+
+        rows = [{
+            "Species": row["species"],
+            "Detections": row["detections"],
+            "Images": len(row["images"]),
+            "Avg Confidence (%)": round(row["total_conf"] / row["detections"] * 100, 1)
+        } for row in summary.values()]
+        return sorted(rows, key=lambda r: (-r["Detections"], r["Species"]))
+
+    def to_json(self):
+        data = {
+            "timestamp": self.created_at.isoformat(),
+            "confidence_threshold": self.conf,
+            "images": [{
+                "file_name": e["name"],
+                "status": e["status"],
+                "error": e["error"],
+                "width": e.get("width"),
+                "height": e.get("height"),
+                "inference_time_ms": e.get("inference_time_ms"),
+                "detections": e["detections"]
+            } for e in self.snapshot()],
+            "species_summary": self.species_summary()
+        }
+        return json.dumps(data, indent=2)
+
+    def to_csv(self):
+        """One row per detection; images without detections get an empty row"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(["file_name", "status", "species", "confidence", "x1", "y1", "x2", "y2"])
+        for e in self.snapshot():
+            if not e["detections"]:
+                writer.writerow([e["name"], e["status"], "", "", "", "", "", ""])
+            for d in e["detections"]:
+                writer.writerow([
+                    e["name"], e["status"], d["species"], round(d["confidence"] * 100, 1),
+                    *[round(v, 1) for v in d["bbox"]]
+                ])
+        return buffer.getvalue()
+
+    def to_zip(self):
+        """Zip of the JSON and CSV exports plus every annotated image"""
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("detections.json", self.to_json())
+            zf.writestr("detections.csv", self.to_csv())
+            for index, entry in enumerate(self.snapshot()):
+                png = self.annotated_png(index)
+                if png is not None:
+                    stem = entry["name"].rsplit(".", 1)[0]
+                    zf.writestr(f"annotated/{index + 1:03d}_{stem}.png", png)
+        return buffer.getvalue()
@@ -0,0 +1,18 @@
+"""Upload configuration endpoint for Netlify Function"""
+import json
+
+def handler(event, context):
+    # Clients downscale to the model input size before uploading, which
+    # keeps bodies well under the 6MB Netlify payload limit
+    return {
+        'statusCode': 200,
+        'headers': {
+            'Access-Control-Allow-Origin': '*',
+            'Content-Type': 'application/json'
+        },
+        'body': json.dumps({
+            "input_size": 640,
+            "encoding": "image/jpeg",
+            "quality": 0.9
+        })
+    }
@@ -25,6 +25,17 @@ except ImportError as e:
 model = None
 model_path = '/tmp/best.pt'
 
+def original_size(headers, image):
+    """Size of the image before client-side downscaling, from x-original-* headers"""
+    try:
+        width = int(headers.get('x-original-width', image.width))
+        height = int(headers.get('x-original-height', image.height))
+    except (TypeError, ValueError):
+        return image.size
+    if width <= 0 or height <= 0:
+        return image.size
+    return width, height
+
 def load_model():
     """Load the YOLO model (cached across invocations)"""
     global model
@@ -52,7 +63,7 @@ def handler(event, context):
                 'statusCode': 200,
                 'headers': {
                     'Access-Control-Allow-Origin': '*',
-                    'Access-Control-Allow-Headers': 'Content-Type',
+                    'Access-Control-Allow-Headers': 'Content-Type, X-Original-Width, X-Original-Height',
                     'Access-Control-Allow-Methods': 'POST, OPTIONS'
                 },
                 'body': ''
@@ -69,28 +80,59 @@ def handler(event, context):
                 'body': json.dumps({"error": "Method not allowed"})
             }
         
-        # Parse request body
-        body = json.loads(event.get('body', '{}'))
-        
-        # Check if image data is provided
-        if 'image' not in body:
-            return {
-                'statusCode': 400,
-                'headers': {
-                    'Access-Control-Allow-Origin': '*',
-                    'Content-Type': 'application/json'
-                },
-                'body': json.dumps({"error": "No image data provided"})
-            }
+        headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
         
-        # Decode base64 image
-        image_data = body['image']
-        if image_data.startswith('data:image'):
-            # Remove data URL prefix
-            image_data = image_data.split(',')[1]
+        if headers.get('content-type', '').startswith('image/'):
+            # Binary upload (already downscaled by the client); Netlify
+            # delivers binary bodies base64-encoded. A plain-text body has
+            # already been decoded as UTF-8 and the image bytes are lost.
+            if not event.get('isBase64Encoded'):
+                return {
+                    'statusCode': 400,
+                    'headers': {
+                        'Access-Control-Allow-Origin': '*',
+                        'Content-Type': 'application/json'
+                    },
+                    'body': json.dumps({"error": "Binary image body was not base64-encoded"})
+                }
+            image_bytes = base64.b64decode(event.get('body') or '')
+            if not image_bytes:
+                return {
+                    'statusCode': 400,
+                    'headers': {
+                        'Access-Control-Allow-Origin': '*',
+                        'Content-Type': 'application/json'
+                    },
+                    'body': json.dumps({"error": "Empty image body"})
+                }
+        else:
+            # Parse request body
+            body = json.loads(event.get('body', '{}'))
+            
+            # Check if image data is provided
+            if 'image' not in body:
+                return {
+                    'statusCode': 400,
+                    'headers': {
+                        'Access-Control-Allow-Origin': '*',
+                        'Content-Type': 'application/json'
+                    },
+                    'body': json.dumps({"error": "No image data provided"})
+                }
+            
+            # Decode base64 image
+            image_data = body['image']
+            if image_data.startswith('data:image'):
+                # Remove data URL prefix
+                image_data = image_data.split(',')[1]
+            
+            image_bytes = base64.b64decode(image_data)
         
-        image_bytes = base64.b64decode(image_data)
         image = Image.open(io.BytesIO(image_bytes))
+        width, height = original_size(headers, image)
+        scale_x = width / image.width
+        scale_y = height / image.height
+        annotate = (event.get('queryStringParameters') or {}).get('annotate', '1') != '0'
         
         # Load model (cached)
         model = load_model()
@@ -101,41 +143,50 @@ def handler(event, context):
         # Run detection
         results = model.predict(image_np, conf=0.25, verbose=False)
         
-        # Get result image with bounding boxes
-        result_img = results[0].plot()
-        
-        # Convert BGR to RGB for display
-        result_img_rgb = cv2.cvtColor(result_img, cv2.COLOR_BGR2RGB)
-        
-        # Encode result image to base64
-        result_pil = Image.fromarray(result_img_rgb)
-        buffer = io.BytesIO()
-        result_pil.save(buffer, format='PNG')
-        result_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-        
-        # Extract detections
+        # Extract detections, with boxes in original-image pixels
         detections = []
         for box in results[0].boxes:
             cls = int(box.cls[0])
             conf = float(box.conf[0])
             label = model.names[cls]
+            x1, y1, x2, y2 = box.xyxy[0].tolist()
             detections.append({
                 "species": label,
-                "confidence": round(conf * 100, 1)
+                "confidence": round(conf * 100, 1),
+                "bbox": [
+                    round(x1 * scale_x, 1), round(y1 * scale_y, 1),
+                    round(x2 * scale_x, 1), round(y2 * scale_y, 1)
+                ]
             })
         
+        payload = {
+            "success": True,
+            "detections": detections,
+            "count": len(detections),
+            "image_size": {"width": width, "height": height}
+        }
+        
+        if annotate:
+            # Get result image with bounding boxes
+            result_img = results[0].plot()
+            
+            # Convert BGR to RGB for display
+            result_img_rgb = cv2.cvtColor(result_img, cv2.COLOR_BGR2RGB)
+            
+            # Encode result image to base64
+            result_pil = Image.fromarray(result_img_rgb)
+            buffer = io.BytesIO()
+            result_pil.save(buffer, format='PNG')
+            result_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+            payload["result_image"] = f"data:image/png;base64,{result_base64}"
+        
         return {
             'statusCode': 200,
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Content-Type': 'application/json'
             },
-            'body': json.dumps({
-                "success": True,
-                "detections": detections,
-                "result_image": f"data:image/png;base64,{result_base64}",
-                "count": len(detections)
-            })
+            'body': json.dumps(payload)
         }
     
     except Exception as e:
@@ -46,6 +46,109 @@ uploadArea.addEventListener('drop', (e) => {
     }
 });
 
+// Upload settings used if the server's /config can't be fetched
+const DEFAULT_UPLOAD_CONFIG = { input_size: 640, encoding: 'image/jpeg', quality: 0.9 };
+
+// Fetched at page load so the first upload doesn't wait on an extra round trip
+const uploadConfigPromise = fetch(`${API_URL}/config`)
+    .then((response) => (response.ok ? response.json() : DEFAULT_UPLOAD_CONFIG))
+    .catch(() => DEFAULT_UPLOAD_CONFIG);
+
+// Resize so the longest side matches the model input size and re-encode.
+// The server resizes to this size anyway, so the extra pixels are wasted bytes.
+async function downscaleImage(bitmap, config) {
+    const scale = Math.min(1, config.input_size / Math.max(bitmap.width, bitmap.height));
+    const width = Math.round(bitmap.width * scale);
+    const height = Math.round(bitmap.height * scale);
+
+    if (typeof OffscreenCanvas !== 'undefined') {
+        const canvas = new OffscreenCanvas(width, height);
+        canvas.getContext('2d').drawImage(bitmap, 0, 0, width, height);
+        return canvas.convertToBlob({ type: config.encoding, quality: config.quality });
+    }
+
+    const canvas = document.createElement('canvas');
+    canvas.width = width;
+    canvas.height = height;
+    canvas.getContext('2d').drawImage(bitmap, 0, 0, width, height);
+    return new Promise((resolve) => canvas.toBlob(resolve, config.encoding, config.quality));
+}
+
+// Longest side of the rendered overlay; keeps the canvas within mobile size limits
+const OVERLAY_MAX_SIZE = 1600;
+
+// Decode and downscale the file for a binary upload.
+// Returns null on any failure so the caller falls back to a multipart upload.
+async function prepareUpload(file) {
+    if (!window.createImageBitmap) {
+        return null;
+    }
+
+    let bitmap = null;
+    try {
+        const config = await uploadConfigPromise;
+        bitmap = await createImageBitmap(file);
+        const blob = await downscaleImage(bitmap, config);
+        // toBlob resolves to null when encoding fails
+        if (blob) {
+            return { bitmap, blob };
+        }
+    } catch (err) {
+        // e.g. the browser can't decode a very large image
+    }
+
+    if (bitmap) {
+        bitmap.close();
+    }
+    return null;
+}
+
+// Draw boxes (already in original-image pixels) over a display-sized copy of the image
+async function drawDetections(bitmap, detections) {
+    const scale = Math.min(1, OVERLAY_MAX_SIZE / Math.max(bitmap.width, bitmap.height));
+    const canvas = document.createElement('canvas');
+    canvas.width = Math.round(bitmap.width * scale);
+    canvas.height = Math.round(bitmap.height * scale);
+    const ctx = canvas.getContext('2d');
+    ctx.drawImage(bitmap, 0, 0, canvas.width, canvas.height);
+
+    const lineWidth = Math.max(2, Math.round(Math.max(canvas.width, canvas.height) / 300));
+    const fontSize = lineWidth * 7;
+    ctx.lineWidth = lineWidth;
+    ctx.font = `${fontSize}px sans-serif`;
+    ctx.textBaseline = 'top';
+
+    detections.forEach((detection) => {
+        const [x1, y1, x2, y2] = detection.bbox.map((v) => v * scale);
+        const label = `${detection.species} ${detection.confidence}%`;
+        const labelWidth = ctx.measureText(label).width + lineWidth * 2;
+        const labelHeight = fontSize + lineWidth * 2;
+        const labelY = y1 >= labelHeight ? y1 - labelHeight : y1;
+
+        ctx.strokeStyle = '#667eea';
+        ctx.strokeRect(x1, y1, x2 - x1, y2 - y1);
+        ctx.fillStyle = '#667eea';
+        ctx.fillRect(x1, labelY, labelWidth, labelHeight);
+        ctx.fillStyle = '#fff';
+        ctx.fillText(label, x1 + lineWidth, labelY + lineWidth);
+    });
+
+    // toBlob encodes off the main thread, unlike toDataURL
+    const blob = await new Promise((resolve) => canvas.toBlob(resolve, 'image/jpeg', 0.9));
+    if (!blob) {
+        throw new Error('Could not render detection overlay');
+    }
+    return URL.createObjectURL(blob);
+}
+
+// Swap an <img> source, releasing the previous object URL if there was one
+function setImageSource(img, src) {
+    if (img.src.startsWith('blob:')) {
+        URL.revokeObjectURL(img.src);
+    }
+    img.src = src;
+}
+
 async function handleFile(file) {
     // Validate file type
     if (!file.type.match('image/jpeg') && !file.type.match('image/png')) {
@@ -58,22 +161,39 @@ async function handleFile(file) {
     resultsSection.style.display = 'none';
     error.style.display = 'none';
 
-    // Display original image
-    const reader = new FileReader();
-    reader.onload = (e) => {
-        originalImage.src = e.target.result;
-    };
-    reader.readAsDataURL(file);
+    // Display original image (object URL avoids base64-encoding the whole file)
+    setImageSource(originalImage, URL.createObjectURL(file));
 
-    // Create form data for Flask API
-    const formData = new FormData();
-    formData.append('image', file);
+    let bitmap = null;
 
     try {
-        const response = await fetch(`${API_URL}/detect`, {
-            method: 'POST',
-            body: formData
-        });
+        let response = null;
+
+        // Downscale in the browser and upload the raw image bytes
+        const upload = await prepareUpload(file);
+        if (upload) {
+            bitmap = upload.bitmap;
+            response = await fetch(`${API_URL}/detect?annotate=0`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': upload.blob.type,
+                    'X-Original-Width': String(bitmap.width),
+                    'X-Original-Height': String(bitmap.height)
+                },
+                body: upload.blob
+            });
+        }
+
+        if (!response) {
+            // Downscaling unavailable or failed: upload the original file and use the server's annotated image
+            const formData = new FormData();
+            formData.append('image', file);
+
+            response = await fetch(`${API_URL}/detect`, {
+                method: 'POST',
+                body: formData
+            });
+        }
 
         if (!response.ok) {
             const errorData = await response.json();
@@ -84,7 +204,7 @@ async function handleFile(file) {
 
         if (data.success) {
             // Display result image
-            resultImage.src = data.result_image;
+            setImageSource(resultImage, data.result_image || await drawDetections(bitmap, data.detections));
 
             // Display detections
             displayDetections(data.detections);
@@ -97,6 +217,9 @@ async function handleFile(file) {
     } catch (err) {
         showError(`Error: ${err.message}`);
     } finally {
+        if (bitmap) {
+            bitmap.close();
+        }
         loading.style.display = 'none';
     }
 }